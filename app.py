@@ -1,16 +1,22 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import io
+import base64
+import hashlib
 from datetime import date, timedelta
-import gspread
-from google.oauth2 import service_account
 import plotly.express as px
 import matplotlib.pyplot as plt
 
 ############################
 # 1. GOOGLE SHEETS HELPERS
 ############################
+@st.cache_resource
 def get_gsheet_connection():
+    # Imported here so script runs that never touch Sheets skip the import cost
+    import gspread
+    from google.oauth2 import service_account
+
     creds_dict = st.secrets["gcp_service_account"]
     creds = service_account.Credentials.from_service_account_info(
         creds_dict,
@@ -22,83 +28,191 @@ def get_gsheet_connection():
     client = gspread.authorize(creds)
     return client
 
+@st.cache_resource
+def open_lease_sheet(sheet_name="LeaseData"):
+    # client.open looks the spreadsheet up by name on every call; do it once
+    client = get_gsheet_connection()
+    return client.open(sheet_name).sheet1
+
+def serialize_frame(df):
+    # Feather (Arrow IPC) bytes, zstd-compressed and base64-encoded to fit in a text cell
+    buf = io.BytesIO()
+    df.to_feather(buf, compression="zstd")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+def deserialize_frame(payload):
+    if payload.lstrip().startswith("{"):
+        # Rows saved before the Feather format are pandas JSON
+        return pd.read_json(io.StringIO(payload))
+    return pd.read_feather(io.BytesIO(base64.b64decode(payload)))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def read_leases_from_gsheet(sheet_name="LeaseData"):
+    # Raises on failure so errors are never cached; cleared after every write
+    sheet = open_lease_sheet(sheet_name)
+    # Expecting columns: ["LeaseName", "SerializedSchedule", "SerializedJournal"]
+    # Only A:C is needed to rebuild leases; skip the header row
+    rows = sheet.get("A2:C")
+    
+    saved_leases = {}
+    for row in rows:
+        if len(row) < 3:
+            continue
+        lease_name, schedule_payload, journal_payload = row
+        schedule_df = deserialize_frame(schedule_payload)
+        journal_df = deserialize_frame(journal_payload)
+        saved_leases[lease_name] = {
+            "schedule": schedule_df,
+            "journal": journal_df
+        }
+    return saved_leases
+
 def load_leases_from_gsheet(sheet_name="LeaseData"):
     try:
-        client = get_gsheet_connection()
-        sheet = client.open(sheet_name).sheet1
-        data = sheet.get_all_records()
-
-        df = pd.DataFrame(data)
-        # Expecting columns: ["LeaseName", "SerializedSchedule", "SerializedJournal"]
-        
-        saved_leases = {}
-        for _, row in df.iterrows():
-            lease_name = row["LeaseName"]
-            schedule_df = pd.read_json(row["SerializedSchedule"])
-            journal_df = pd.read_json(row["SerializedJournal"])
-            saved_leases[lease_name] = {
-                "schedule": schedule_df,
-                "journal": journal_df
-            }
-        return saved_leases
+        return read_leases_from_gsheet(sheet_name)
     except Exception as e:
         st.warning(f"Unable to load from Google Sheets: {e}")
         return {}
 
-def save_lease_to_gsheet(lease_name, schedule_df, journal_df, sheet_name="LeaseData"):
+def serialize_lease_row(lease_name, schedule_df, journal_df):
+    schedule_payload = serialize_frame(schedule_df)
+    journal_payload = serialize_frame(journal_df)
+    # Column D fingerprints the payloads so unchanged overwrites can be skipped.
+    # It has no header and only update_lease_in_gsheet reads it.
+    # Prefixed so USER_ENTERED never parses an all-digit digest as a number.
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(schedule_payload.encode("ascii"))
+    digest.update(journal_payload.encode("ascii"))
+    return [lease_name, schedule_payload, journal_payload, f"b2:{digest.hexdigest()}"]
+
+def save_leases_to_gsheet(leases, sheet_name="LeaseData"):
+    # Append many leases ({name: {"schedule", "journal"}}) in one API call
     try:
-        client = get_gsheet_connection()
-        sheet = client.open(sheet_name).sheet1
+        sheet = open_lease_sheet(sheet_name)
         
-        schedule_json = schedule_df.to_json()
-        journal_json = journal_df.to_json()
-        
-        new_row = [lease_name, schedule_json, journal_json]
-        sheet.append_row(new_row, value_input_option="USER_ENTERED")
+        new_rows = [
+            serialize_lease_row(lease_name, data["schedule"], data["journal"])
+            for lease_name, data in leases.items()
+        ]
+        sheet.append_rows(new_rows, value_input_option="USER_ENTERED")
+        read_leases_from_gsheet.clear()
     except Exception as e:
         st.warning(f"Unable to save to Google Sheets: {e}")
 
+def save_lease_to_gsheet(lease_name, schedule_df, journal_df, sheet_name="LeaseData"):
+    save_leases_to_gsheet({lease_name: {"schedule": schedule_df, "journal": journal_df}}, sheet_name)
+
 def delete_lease_in_gsheet(lease_name, sheet_name="LeaseData"):
     try:
-        client = get_gsheet_connection()
-        sheet = client.open(sheet_name).sheet1
-        records = sheet.get_all_records()
+        sheet = open_lease_sheet(sheet_name)
+        lease_names = sheet.col_values(1)
         
-        for i, row in enumerate(records, start=2):
-            if row.get("LeaseName") == lease_name:
-                sheet.delete_rows(i)
-                break
+        # Saves append, so a name can repeat; remove every row for it, bottom-up
+        # so earlier row numbers stay valid, in one batch request
+        rows = [i for i, name in enumerate(lease_names[1:], start=2) if name == str(lease_name)]
+        if rows:
+            sheet.spreadsheet.batch_update({"requests": [
+                {"deleteDimension": {"range": {
+                    "sheetId": sheet.id,
+                    "dimension": "ROWS",
+                    "startIndex": row - 1,
+                    "endIndex": row
+                }}}
+                for row in reversed(rows)
+            ]})
+            read_leases_from_gsheet.clear()
+        return True
     except Exception as e:
         st.warning(f"Unable to delete lease '{lease_name}' from Google Sheets: {e}")
+        return False
 
 def update_lease_in_gsheet(lease_name, schedule_df, journal_df, sheet_name="LeaseData"):
-    # Helper: delete + re-append
-    delete_lease_in_gsheet(lease_name, sheet_name)
-    save_lease_to_gsheet(lease_name, schedule_df, journal_df, sheet_name)
+    # Overwrite the lease's row in place; append if it is not in the sheet yet
+    try:
+        sheet = open_lease_sheet(sheet_name)
+        name_cells, hash_cells = sheet.batch_get(["A:A", "D:D"])
+        lease_names = [cells[0] if cells else "" for cells in name_cells]
+        new_row = serialize_lease_row(lease_name, schedule_df, journal_df)
+
+        if str(lease_name) in lease_names[1:]:
+            # Saves append, so a name can repeat; the loader keeps the last row
+            index = len(lease_names) - 1 - lease_names[::-1].index(str(lease_name))
+            stored_hash = hash_cells[index][0] if index < len(hash_cells) and hash_cells[index] else ""
+            if stored_hash == new_row[-1]:
+                return
+            row = index + 1
+            sheet.batch_update(
+                [{"range": f"A{row}:D{row}", "values": [new_row]}],
+                value_input_option="USER_ENTERED"
+            )
+        else:
+            sheet.append_row(new_row, value_input_option="USER_ENTERED")
+        read_leases_from_gsheet.clear()
+    except Exception as e:
+        st.warning(f"Unable to update lease '{lease_name}' in Google Sheets: {e}")
 
 ############################
 # 2. HELPER FUNCTIONS
 ############################
 def generate_monthly_payments(base_payment, lease_term, annual_escalation_rate, payment_timing="end"):
-    payments = []
-    for month in range(1, lease_term + 1):
-        years_elapsed = (month - 1) // 12
-        pay = base_payment * (1 + annual_escalation_rate) ** years_elapsed
-        payments.append(pay)
+    if annual_escalation_rate == 0:
+        return np.full(lease_term, float(base_payment))
+    # One escalation factor per lease year, repeated across its 12 months
+    n_years = (lease_term + 11) // 12
+    yearly = base_payment * np.power(1.0 + annual_escalation_rate, np.arange(n_years))
+    payments = np.repeat(yearly, 12)[:lease_term]
     return payments
 
-def present_value_of_varied_payments(payments, monthly_rate, payment_timing="end"):
-    pv = 0.0
-    for i, pmt in enumerate(payments, start=1):
-        if payment_timing == "end":
-            pv += pmt / ((1 + monthly_rate) ** i)
-        else:
-            pv += pmt / ((1 + monthly_rate) ** (i - 1))
-    return pv
+def _annuity_factor(months, monthly_rate, payment_timing="end"):
+    if monthly_rate == 0:
+        return float(months)
+    v = 1.0 / (1.0 + monthly_rate)
+    factor = (1.0 - v ** months) / monthly_rate
+    return factor if payment_timing == "end" else factor * (1.0 + monthly_rate)
+
+def present_value_of_escalating_payments(base_payment, lease_term, monthly_rate,
+                                         annual_escalation_rate, payment_timing="end"):
+    # PV of generate_monthly_payments(...) summed one lease year at a time:
+    # each year is a 12-month annuity scaled by (1+g)^y and discounted 12y months
+    if annual_escalation_rate == 0:
+        return float(base_payment * _annuity_factor(lease_term, monthly_rate, payment_timing))
+    full_years, remainder = divmod(lease_term, 12)
+    year_discount = (1.0 + monthly_rate) ** -12
+    year_factor = (1.0 + annual_escalation_rate) * year_discount
+    pv = _annuity_factor(12, monthly_rate, payment_timing) * np.sum(np.power(year_factor, np.arange(full_years)))
+    if remainder:
+        pv += year_factor ** full_years * _annuity_factor(remainder, monthly_rate, payment_timing)
+    return float(base_payment * pv)
+
+def generate_monthly_dates(start_date, lease_term):
+    # Same dates as start + DateOffset(months=k): keep the start day,
+    # clipped to the last day of shorter months
+    start = pd.Timestamp(start_date)
+    months = pd.period_range(start, periods=lease_term, freq="M")
+    month_starts = months.to_timestamp()
+    days_from_start = (
+        (month_starts - month_starts[0]).days
+        + np.minimum(start.day, months.days_in_month)
+        - start.day
+    )
+    return start + pd.to_timedelta(days_from_start, unit="D")
+
+def money_column_config(columns):
+    # Formatting is applied client-side by Streamlit, not per cell in Python;
+    # "accounting" groups thousands with two decimals, like the old "{:,.2f}"
+    return {col: st.column_config.NumberColumn(format="accounting") for col in columns}
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def dataframe_to_csv_bytes(df, **to_csv_kwargs):
+    # Encode straight into a bytes buffer instead of building a str first
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, lineterminator="\n", **to_csv_kwargs)
+    return buf.getvalue()
 
 ############################
 # 3. MAIN AMORTIZATION FUNCTION
 ############################
+@st.cache_data(show_spinner=False, max_entries=128)
 def generate_amortization_schedule(
     lease_term,
     base_payment,
@@ -113,153 +227,147 @@ def generate_amortization_schedule(
     )
     
     monthly_rate = annual_discount_rate / 12.0
-    lease_liability = present_value_of_varied_payments(monthly_payments, monthly_rate, payment_timing)
-    rou_asset = lease_liability
-    schedule_rows = []
-    liability_balance = lease_liability
-    
+    lease_liability = present_value_of_escalating_payments(
+        base_payment, lease_term, monthly_rate, annual_escalation_rate, payment_timing
+    )
+
+    # Closed form of the balance recurrence. For end-of-period payments
+    # B_k = B_{k-1} * (1 + r) - p_k, so B_k = (1 + r)^k * (B_0 - sum_{j<=k} p_j / (1 + r)^j).
+    # For beginning-of-period payments the full payment reduces principal.
+    if payment_timing == "end":
+        growth = np.power(1.0 + monthly_rate, np.arange(1, lease_term + 1))
+        liability_arr = np.cumsum(monthly_payments / growth)
+        np.subtract(lease_liability, liability_arr, out=liability_arr)
+        liability_arr *= growth
+        interest_arr = np.empty(lease_term)
+        interest_arr[0] = lease_liability
+        interest_arr[1:] = liability_arr[:-1]
+        interest_arr *= monthly_rate
+        principal_arr = monthly_payments - interest_arr
+    else:
+        principal_arr = monthly_payments
+        liability_arr = lease_liability - np.cumsum(principal_arr)
+        interest_arr = liability_arr * monthly_rate
+
     if lease_type == "Operating":
-        total_lease_expense_per_month = sum(monthly_payments) / lease_term
-    
-    for period in range(1, lease_term + 1):
-        payment = monthly_payments[period - 1]
-        interest = liability_balance * monthly_rate
-        
-        if payment_timing == "end":
-            principal = payment - interest
-        else:
-            principal = payment
-            interest = (liability_balance - principal) * monthly_rate
-        
-        new_balance = liability_balance - principal
-        
-        if lease_type == "Operating":
-            total_lease_expense = sum(monthly_payments) / lease_term
-            rou_amort = total_lease_expense - interest
-            rou_asset -= rou_amort
-        else:
-            rou_amort = rou_asset / lease_term
-        
-        schedule_rows.append({
-            "Period": period,
-            "Date": pd.to_datetime(start_date) + pd.DateOffset(months=period - 1),
-            "Payment": payment,
-            "Interest_Expense": interest,
-            "Principal": principal,
-            "Lease_Liability_Balance": new_balance,
-            "ROU_Asset_Amortization": rou_amort,
-            "ROU_Asset_Balance": max(rou_asset, 0),
-        })
-        
-        liability_balance = new_balance
-    
-    return pd.DataFrame(schedule_rows)
+        # Straight-line expense is constant across the term; compute it once
+        straight_line_expense = float(np.sum(monthly_payments)) / lease_term
+        rou_amort_arr = straight_line_expense - interest_arr
+        rou_asset_arr = np.cumsum(rou_amort_arr)
+        np.subtract(lease_liability, rou_asset_arr, out=rou_asset_arr)
+    else:
+        rou_amort_arr = np.full(lease_term, lease_liability / lease_term)
+        rou_asset_arr = np.full(lease_term, lease_liability)
+    rou_balance_arr = np.maximum(rou_asset_arr, 0)
+
+    return pd.DataFrame({
+        "Period": np.arange(1, lease_term + 1),
+        "Date": generate_monthly_dates(start_date, lease_term),
+        "Payment": monthly_payments,
+        "Interest_Expense": interest_arr,
+        "Principal": principal_arr,
+        "Lease_Liability_Balance": liability_arr,
+        "ROU_Asset_Amortization": rou_amort_arr,
+        "ROU_Asset_Balance": rou_balance_arr,
+    })
 
 ############################
 # 4. JOURNAL ENTRY CREATION
 ############################
+OPERATING_JOURNAL_ACCOUNTS = np.array([
+    "Lease Expense",
+    "Cash",
+    "ROU Asset Amortization Expense",
+    "Accumulated Amortization - ROU Asset"
+], dtype=object)
+
+FINANCE_JOURNAL_ACCOUNTS = np.array([
+    "Interest Expense",
+    "Lease Liability",
+    "Cash",
+    "Amortization Expense - ROU Asset",
+    "Accumulated Amortization - ROU Asset"
+], dtype=object)
+
+@st.cache_data(show_spinner=False, max_entries=128)
 def generate_monthly_journal_entries(schedule_df, lease_type="Operating"):
-    entries = []
-    for _, row in schedule_df.iterrows():
-        period = row["Period"]
-        date_val = row["Date"]
-        pay = row["Payment"]
-        interest = row["Interest_Expense"]
-        principal = row["Principal"]
-        rou_amort = row["ROU_Asset_Amortization"]
-        
-        if lease_type == "Operating":
-            entries.append({
-                "Date": date_val,
-                "Period": period,
-                "Account": "Lease Expense",
-                "Debit": round(pay, 2),
-                "Credit": 0.0
-            })
-            entries.append({
-                "Date": date_val,
-                "Period": period,
-                "Account": "Cash",
-                "Debit": 0.0,
-                "Credit": round(pay, 2)
-            })
-            if rou_amort != 0.0:
-                entries.append({
-                    "Date": date_val,
-                    "Period": period,
-                    "Account": "ROU Asset Amortization Expense",
-                    "Debit": round(rou_amort, 2),
-                    "Credit": 0.0
-                })
-                entries.append({
-                    "Date": date_val,
-                    "Period": period,
-                    "Account": "Accumulated Amortization - ROU Asset",
-                    "Debit": 0.0,
-                    "Credit": round(rou_amort, 2)
-                })
-        else:
-            entries.append({
-                "Date": date_val,
-                "Period": period,
-                "Account": "Interest Expense",
-                "Debit": round(interest, 2),
-                "Credit": 0.0
-            })
-            entries.append({
-                "Date": date_val,
-                "Period": period,
-                "Account": "Lease Liability",
-                "Debit": round(principal, 2),
-                "Credit": 0.0
-            })
-            entries.append({
-                "Date": date_val,
-                "Period": period,
-                "Account": "Cash",
-                "Debit": 0.0,
-                "Credit": round(pay, 2)
-            })
-            if rou_amort != 0.0:
-                entries.append({
-                    "Date": date_val,
-                    "Period": period,
-                    "Account": "Amortization Expense - ROU Asset",
-                    "Debit": round(rou_amort, 2),
-                    "Credit": 0.0
-                })
-                entries.append({
-                    "Date": date_val,
-                    "Period": period,
-                    "Account": "Accumulated Amortization - ROU Asset",
-                    "Debit": 0.0,
-                    "Credit": round(rou_amort, 2)
-                })
-    return pd.DataFrame(entries)
+    n = len(schedule_df)
+    has_rou = schedule_df["ROU_Asset_Amortization"].to_numpy() != 0.0
+    # Round every amount column in one pass
+    pay, interest, principal, rou = np.round(
+        schedule_df[["Payment", "Interest_Expense", "Principal", "ROU_Asset_Amortization"]]
+        .to_numpy(dtype=np.float64).T,
+        2
+    )
+    zero = np.zeros(n)
+    every_period = np.ones(n, dtype=bool)
+
+    # One debit, credit and rows-kept column per account, in account order
+    if lease_type == "Operating":
+        account_names = OPERATING_JOURNAL_ACCOUNTS
+        debits = [pay, zero, rou, zero]
+        credits = [zero, pay, zero, rou]
+        keeps = [every_period, every_period, has_rou, has_rou]
+    else:
+        account_names = FINANCE_JOURNAL_ACCOUNTS
+        debits = [interest, principal, zero, rou, zero]
+        credits = [zero, zero, pay, zero, rou]
+        keeps = [every_period, every_period, every_period, has_rou, has_rou]
+    if not has_rou.any():
+        # The two ROU accounts come last; skip building them when unused
+        account_names, debits, credits, keeps = (
+            account_names[:-2], debits[:-2], credits[:-2], keeps[:-2]
+        )
+    n_accounts = len(account_names)
+
+    # Stack account columns side by side and ravel row-major, so entries
+    # come out grouped by period in account order
+    keep = np.column_stack(keeps).ravel()
+    return pd.DataFrame({
+        "Date": np.repeat(schedule_df["Date"].to_numpy(), n_accounts)[keep],
+        "Period": np.repeat(schedule_df["Period"].to_numpy(), n_accounts)[keep],
+        "Account": np.tile(account_names, n)[keep],
+        "Debit": np.column_stack(debits).ravel()[keep],
+        "Credit": np.column_stack(credits).ravel()[keep]
+    })
 
 ############################
 # 5. CONSOLIDATED REPORTS
 ############################
-def portfolio_liab_by_period(all_leases: dict, start_date: date, end_date: date):
-    frames = []
-    for lease_name, data in all_leases.items():
-        df = data["schedule"].copy()
-        df["LeaseName"] = lease_name
-        frames.append(df)
-    
+PORTFOLIO_COLUMNS = ["Payment", "Interest_Expense", "Principal", "Lease_Liability_Balance",
+                     "ROU_Asset_Amortization", "ROU_Asset_Balance"]
+
+def portfolio_schedule_rows(all_leases: dict, start_date: date, end_date: date):
+    # One concat feeds both rollforwards. Only the columns they sum are
+    # concatenated; selecting them already yields new frames, so the
+    # schedules are never copied whole
+    frames = [data["schedule"][["Period", "Date"] + PORTFOLIO_COLUMNS] for data in all_leases.values()]
     if not frames:
         return pd.DataFrame()
     
     big_df = pd.concat(frames, ignore_index=True)
-    
-    mask = (big_df["Date"] >= pd.to_datetime(start_date)) & (big_df["Date"] <= pd.to_datetime(end_date))
-    big_df = big_df[mask]
+    return big_df[big_df["Date"].between(pd.Timestamp(start_date), pd.Timestamp(end_date))]
+
+def sum_by_period(big_df, sum_cols):
+    periods = big_df["Period"].to_numpy()
+    if not np.issubdtype(periods.dtype, np.integer) or periods.min() < 0:
+        return big_df.groupby("Period")[sum_cols].sum().reset_index()
+    # Periods are small dense integers, so one bincount per column does the
+    # group-by; keep only periods that actually occur
+    counts = np.bincount(periods)
+    present = np.flatnonzero(counts)
+    grouped = pd.DataFrame({"Period": present})
+    for col in sum_cols:
+        grouped[col] = np.bincount(periods, weights=big_df[col].to_numpy(), minlength=len(counts))[present]
+    return grouped
+
+def portfolio_liab_by_period(big_df: pd.DataFrame):
+    sum_cols = ["Payment", "Interest_Expense", "Principal", "Lease_Liability_Balance"]
     
     if big_df.empty:
         return pd.DataFrame()
     
-    sum_cols = ["Payment", "Interest_Expense", "Principal", "Lease_Liability_Balance"]
-    grouped = big_df.groupby("Period")[sum_cols].sum().reset_index().sort_values("Period")
+    grouped = sum_by_period(big_df, sum_cols)
 
     grouped.rename(columns={
         "Payment": "Total Payment",
@@ -268,49 +376,43 @@ def portfolio_liab_by_period(all_leases: dict, start_date: date, end_date: date)
         "Lease_Liability_Balance": "Ending Liability"
     }, inplace=True)
     
-    beginning_liabilities = []
-    prev_end = 0.0
-    for i, row in grouped.iterrows():
-        beginning_liabilities.append(prev_end)
-        prev_end = row["Ending Liability"]
-    grouped.insert(1, "Beginning Liability", beginning_liabilities)
+    grouped.insert(1, "Beginning Liability", grouped["Ending Liability"].shift(1, fill_value=0.0))
     
     return grouped
 
-def portfolio_rou_by_period(all_leases: dict, start_date: date, end_date: date):
-    frames = []
-    for lease_name, data in all_leases.items():
-        df = data["schedule"].copy()
-        df["LeaseName"] = lease_name
-        frames.append(df)
-    
-    if not frames:
-        return pd.DataFrame()
-    
-    big_df = pd.concat(frames, ignore_index=True)
-    mask = (big_df["Date"] >= pd.to_datetime(start_date)) & (big_df["Date"] <= pd.to_datetime(end_date))
-    big_df = big_df[mask]
+def portfolio_rou_by_period(big_df: pd.DataFrame):
+    sum_cols = ["ROU_Asset_Amortization", "ROU_Asset_Balance"]
     
     if big_df.empty:
         return pd.DataFrame()
     
-    sum_cols = ["ROU_Asset_Amortization", "ROU_Asset_Balance"]
-    grouped = big_df.groupby("Period")[sum_cols].sum().reset_index().sort_values("Period")
+    grouped = sum_by_period(big_df, sum_cols)
 
     grouped.rename(columns={
         "ROU_Asset_Amortization": "Total Amortization",
         "ROU_Asset_Balance": "Ending ROU Asset"
     }, inplace=True)
     
-    beginnings = []
-    prev_end = 0.0
-    for i, row in grouped.iterrows():
-        beginnings.append(prev_end)
-        prev_end = row["Ending ROU Asset"]
-    grouped.insert(1, "Beginning ROU Asset", beginnings)
+    grouped.insert(1, "Beginning ROU Asset", grouped["Ending ROU Asset"].shift(1, fill_value=0.0))
     
     return grouped
 
+def session_portfolio_reports(start_date: date, end_date: date):
+    # Memoized per session: hashing every saved schedule for st.cache_data
+    # would cost as much as the rollup itself. Only the latest date range is
+    # kept, so picking new ranges does not grow session memory
+    key = (start_date, end_date)
+    reports = st.session_state.get("portfolio_reports", {})
+    if key not in reports:
+        big_df = portfolio_schedule_rows(st.session_state["saved_leases"], start_date, end_date)
+        reports = {key: (portfolio_liab_by_period(big_df), portfolio_rou_by_period(big_df))}
+        st.session_state["portfolio_reports"] = reports
+    return reports[key]
+
+def mark_leases_changed():
+    # Call after any change to st.session_state["saved_leases"]
+    st.session_state.pop("portfolio_reports", None)
+
 ############################
 # 6. CONSOLIDATED JOURNAL VIEW
 ############################
@@ -374,11 +476,11 @@ def main():
                     "schedule": df_schedule,
                     "journal": df_journal
                 }
+                mark_leases_changed()
                 # Save to Google Sheets
                 save_lease_to_gsheet(lease_name, df_schedule, df_journal, "LeaseData")
                 
                 st.success(f"Lease schedule for '{lease_name}' generated and saved!")
-                st.session_state["saved_leases"] = load_leases_from_gsheet("LeaseData")
 
             st.write("---")
             st.header("Mass Upload Leases via CSV")
@@ -395,6 +497,7 @@ def main():
                     else:
                         success_count = 0
                         error_count = 0
+                        uploaded_leases = {}
                         for idx, row in df_csv.iterrows():
                             try:
                                 ln = str(row["LeaseName"]).strip()
@@ -417,18 +520,20 @@ def main():
                                 )
                                 journal = generate_monthly_journal_entries(schedule, lease_type=lt)
 
-                                st.session_state["saved_leases"][ln] = {
+                                uploaded_leases[ln] = {
                                     "schedule": schedule,
                                     "journal": journal
                                 }
-                                save_lease_to_gsheet(ln, schedule, journal, "LeaseData")
                                 
                                 success_count += 1
                             except Exception as ex:
                                 st.warning(f"Row {idx} failed: {ex}")
                                 error_count += 1
+                        if uploaded_leases:
+                            st.session_state["saved_leases"].update(uploaded_leases)
+                            mark_leases_changed()
+                            save_leases_to_gsheet(uploaded_leases, "LeaseData")
                         st.success(f"CSV processed! {success_count} leases uploaded, {error_count} errors.")
-                        st.session_state["saved_leases"] = load_leases_from_gsheet("LeaseData")
             st.markdown("""
             **CSV Format** (one lease per row). Required columns:
             - LeaseName
@@ -444,6 +549,16 @@ def main():
         # Main area: "View / Edit Saved Lease"
         st.subheader("View / Edit Saved Lease")
 
+        # Session state is only loaded on first run; pull other users' changes on demand
+        if st.button("Refresh from Google Sheets"):
+            read_leases_from_gsheet.clear()
+            # Read directly so a Sheets error keeps the current leases instead of emptying them
+            try:
+                st.session_state["saved_leases"] = read_leases_from_gsheet("LeaseData")
+                mark_leases_changed()
+            except Exception as e:
+                st.warning(f"Unable to refresh from Google Sheets: {e}")
+
         saved_lease_names = list(st.session_state["saved_leases"].keys())
         if saved_lease_names:
             selected_lease = st.selectbox("Select a saved lease to view:", options=saved_lease_names)
@@ -453,16 +568,17 @@ def main():
 
                 st.subheader(f"Lease Amortization Schedule: {selected_lease}")
                 st.dataframe(
-                    df_schedule.style.format({
-                        "Payment": "{:,.2f}",
-                        "Interest_Expense": "{:,.2f}",
-                        "Principal": "{:,.2f}",
-                        "Lease_Liability_Balance": "{:,.2f}",
-                        "ROU_Asset_Amortization": "{:,.2f}",
-                        "ROU_Asset_Balance": "{:,.2f}",
-                    })
+                    df_schedule,
+                    column_config=money_column_config([
+                        "Payment",
+                        "Interest_Expense",
+                        "Principal",
+                        "Lease_Liability_Balance",
+                        "ROU_Asset_Amortization",
+                        "ROU_Asset_Balance",
+                    ])
                 )
-                csv_schedule = df_schedule.to_csv(index=False).encode('utf-8')
+                csv_schedule = dataframe_to_csv_bytes(df_schedule, float_format="%.2f")
                 st.download_button(
                     label="Download Amortization Schedule (CSV)",
                     data=csv_schedule,
@@ -475,10 +591,11 @@ def main():
                 col1, col2 = st.columns([1,1])
                 with col1:
                     if st.button("Delete Lease"):
-                        delete_lease_in_gsheet(selected_lease, "LeaseData")
-                        del st.session_state["saved_leases"][selected_lease]
-                        st.success(f"Deleted lease '{selected_lease}'!")
-                        st.session_state["saved_leases"] = load_leases_from_gsheet("LeaseData")
+                        # No reload follows, so keep the session lease unless the sheet rows are gone
+                        if delete_lease_in_gsheet(selected_lease, "LeaseData"):
+                            del st.session_state["saved_leases"][selected_lease]
+                            mark_leases_changed()
+                            st.success(f"Deleted lease '{selected_lease}'!")
                 with col2:
                     if st.button("Overwrite with Current Sidebar Inputs"):
                         updated_schedule = generate_amortization_schedule(
@@ -498,8 +615,8 @@ def main():
                             "schedule": updated_schedule,
                             "journal": updated_journal
                         }
+                        mark_leases_changed()
                         st.success(f"Lease '{selected_lease}' updated with current sidebar inputs!")
-                        st.session_state["saved_leases"] = load_leases_from_gsheet("LeaseData")
         else:
             st.info("No leases saved yet. Create or upload some in the sidebar to display them here.")
 
@@ -522,13 +639,14 @@ def main():
                     df_show = df_all_journals[df_all_journals["LeaseName"] == selected_journal_lease]
                 
                 st.dataframe(
-                    df_show.style.format({
-                        "Debit": "{:,.2f}",
-                        "Credit": "{:,.2f}"
-                    })
+                    df_show,
+                    column_config=money_column_config([
+                        "Debit",
+                        "Credit",
+                    ])
                 )
                 
-                csv_journals = df_show.to_csv(index=False).encode('utf-8')
+                csv_journals = dataframe_to_csv_bytes(df_show)
                 st.download_button(
                     label="Download Journal Entries (CSV)",
                     data=csv_journals,
@@ -547,20 +665,21 @@ def main():
             report_end = st.date_input("Report End Date", value=date.today() + timedelta(days=365))
 
             st.subheader("Consolidated Liability (Period-Level)")
-            df_liab = portfolio_liab_by_period(st.session_state["saved_leases"], report_start, report_end)
+            df_liab, df_rou = session_portfolio_reports(report_start, report_end)
             if df_liab.empty:
                 st.write("No data in the selected date range.")
             else:
                 st.dataframe(
-                    df_liab.style.format({
-                        "Beginning Liability": "{:,.2f}",
-                        "Total Payment": "{:,.2f}",
-                        "Total Interest": "{:,.2f}",
-                        "Total Principal": "{:,.2f}",
-                        "Ending Liability": "{:,.2f}"
-                    })
+                    df_liab,
+                    column_config=money_column_config([
+                        "Beginning Liability",
+                        "Total Payment",
+                        "Total Interest",
+                        "Total Principal",
+                        "Ending Liability",
+                    ])
                 )
-                csv_liab = df_liab.to_csv(index=False).encode("utf-8")
+                csv_liab = dataframe_to_csv_bytes(df_liab, float_format="%.2f")
                 st.download_button(
                     label="Download Portfolio Liability Rollforward (CSV)",
                     data=csv_liab,
@@ -569,18 +688,18 @@ def main():
                 )
 
             st.subheader("Consolidated ROU Asset (Period-Level)")
-            df_rou = portfolio_rou_by_period(st.session_state["saved_leases"], report_start, report_end)
             if df_rou.empty:
                 st.write("No data in the selected date range.")
             else:
                 st.dataframe(
-                    df_rou.style.format({
-                        "Beginning ROU Asset": "{:,.2f}",
-                        "Total Amortization": "{:,.2f}",
-                        "Ending ROU Asset": "{:,.2f}"
-                    })
+                    df_rou,
+                    column_config=money_column_config([
+                        "Beginning ROU Asset",
+                        "Total Amortization",
+                        "Ending ROU Asset",
+                    ])
                 )
-                csv_rou = df_rou.to_csv(index=False).encode("utf-8")
+                csv_rou = dataframe_to_csv_bytes(df_rou, float_format="%.2f")
                 st.download_button(
                     label="Download Portfolio ROU Asset Rollforward (CSV)",
                     data=csv_rou,
@@ -626,9 +745,12 @@ def main():
                 frames.append(data["schedule"])
 
             if frames:
-                combined_df = pd.concat(frames, ignore_index=True)
-                line_data = combined_df.groupby("Date")["Lease_Liability_Balance"].sum().reset_index()
-                line_data.sort_values("Date", inplace=True)
+                combined_df = pd.concat(
+                    [df[["Date", "Lease_Liability_Balance"]] for df in frames],
+                    ignore_index=True
+                )
+                # groupby already returns the dates sorted
+                line_data = combined_df.groupby("Date", as_index=False)["Lease_Liability_Balance"].sum()
 
                 fig_line = px.line(
                     line_data,
@@ -643,9 +765,8 @@ def main():
 
             # 3) Simple Pie Chart Example
             if frames:
-                combined_df = pd.concat(frames, ignore_index=True)
-                total_amort = combined_df["ROU_Asset_Amortization"].sum()
-                total_pay = combined_df["Payment"].sum()
+                total_amort = sum(df["ROU_Asset_Amortization"].sum() for df in frames)
+                total_pay = sum(df["Payment"].sum() for df in frames)
 
                 labels = ["Total ROU Amort.", "Total Payment"]
                 values = [total_amort, total_pay]